@@ -4,13 +4,17 @@
 # you may not use this file except in compliance with the Elastic License 2.0.
 #
 """Tests the Salesforce source class methods"""
+import asyncio
+import json
 import re
 from contextlib import asynccontextmanager
-from copy import deepcopy
-from unittest import TestCase, mock
+from functools import lru_cache
+from types import MappingProxyType
+from unittest import mock
 from unittest.mock import patch
 
 import pytest
+import pytest_asyncio
 from aiohttp.client_exceptions import ClientConnectionError
 from aioresponses import CallbackResult
 
@@ -18,6 +22,7 @@ from connectors.source import ConfigurableFieldValueError, DataSourceConfigurati
 from connectors.sources.salesforce import (
     API_VERSION,
     RELEVANT_SOBJECT_FIELDS,
+    RETRIES,
     ConnectorRequestError,
     InvalidCredentialsException,
     InvalidQueryException,
@@ -33,7 +38,10 @@ TEST_DOMAIN = "fake"
 CONTENT_VERSION_ID = "content_version_id"
 TEST_BASE_URL = f"https://{TEST_DOMAIN}.my.salesforce.com"
 TEST_FILE_DOWNLOAD_URL = f"{TEST_BASE_URL}/services/data/{API_VERSION}/sobjects/ContentVersion/{CONTENT_VERSION_ID}/VersionData"
-TEST_QUERY_MATCH_URL = re.compile(f"{TEST_BASE_URL}/services/data/{API_VERSION}/query*")
+TEST_QUERY_MATCH_URL = re.compile(
+    rf"{TEST_BASE_URL}/services/data/{API_VERSION}/query\?"
+)
+FROM_TABLE_PATTERN = re.compile(r"\bFROM\s+(\w+)")
 TEST_CLIENT_ID = "1234"
 TEST_CLIENT_SECRET = "9876"
 
@@ -89,6 +97,30 @@ ACCOUNT_RESPONSE_PAYLOAD = {
     ],
 }
 
+EXPECTED_ACCOUNT_DOC = {
+    "_id": "account_id",
+    "account_type": "Customer - Direct",
+    "address": "The Burrow under the Hill, Bag End, Hobbiton, The Shire, Eriador, 111, Middle Earth",
+    "body": "A story about the One Ring.",
+    "content_source_id": "account_id",
+    "created_at": "",
+    "last_updated": "",
+    "owner": "Frodo",
+    "owner_email": "frodo@tlotr.com",
+    "open_activities": "",
+    "open_activities_urls": "",
+    "opportunity_name": "The Fellowship",
+    "opportunity_status": "Closed Won",
+    "opportunity_url": f"{TEST_BASE_URL}/opportunity_id",
+    "rating": "Hot",
+    "source": "salesforce",
+    "tags": ["Customer - Direct"],
+    "title": "TLOTR",
+    "type": "account",
+    "url": f"{TEST_BASE_URL}/account_id",
+    "website_url": "www.tlotr.com",
+}
+
 OPPORTUNITY_RESPONSE_PAYLOAD = {
     "totalSize": 1,
     "done": True,
@@ -117,6 +149,22 @@ OPPORTUNITY_RESPONSE_PAYLOAD = {
     ],
 }
 
+EXPECTED_OPPORTUNITY_DOC = {
+    "_id": "opportunity_id",
+    "body": "A fellowship of the races of Middle Earth",
+    "content_source_id": "opportunity_id",
+    "created_at": "",
+    "last_updated": "",
+    "next_step": None,
+    "owner": "Frodo",
+    "owner_email": "frodo@tlotr.com",
+    "source": "salesforce",
+    "status": "Closed Won",
+    "title": "The Fellowship",
+    "type": "opportunity",
+    "url": f"{TEST_BASE_URL}/opportunity_id",
+}
+
 CONTACT_RESPONSE_PAYLOAD = {
     "records": [
         {
@@ -140,6 +188,41 @@ CONTACT_RESPONSE_PAYLOAD = {
     ],
 }
 
+EXPECTED_CONTACT_RECORD = MappingProxyType(
+    {
+        **CONTACT_RESPONSE_PAYLOAD["records"][0],
+        "Account": {
+            "Id": "account_id",
+            "Name": "TLOTR",
+        },
+        "Owner": {
+            "Id": "user_id",
+            "Name": "Frodo",
+            "Email": "frodo@tlotr.com",
+        },
+    }
+)
+
+EXPECTED_CONTACT_DOC = {
+    "_id": "contact_id",
+    "account": "TLOTR",
+    "account_url": f"{TEST_BASE_URL}/account_id",
+    "body": "The White",
+    "created_at": "",
+    "email": "gandalf@tlotr.com",
+    "job_title": "Wizard",
+    "last_updated": "",
+    "lead_source": "Partner Referral",
+    "owner": "Frodo",
+    "owner_url": f"{TEST_BASE_URL}/user_id",
+    "phone": "12345678",
+    "source": "salesforce",
+    "thumbnail": f"{TEST_BASE_URL}/services/images/photo/photo_id",
+    "title": "Gandalf",
+    "type": "contact",
+    "url": f"{TEST_BASE_URL}/contact_id",
+}
+
 LEAD_RESPONSE_PAYLOAD = {
     "records": [
         {
@@ -168,6 +251,48 @@ LEAD_RESPONSE_PAYLOAD = {
     ]
 }
 
+EXPECTED_LEAD_RECORD = MappingProxyType(
+    {
+        **LEAD_RESPONSE_PAYLOAD["records"][0],
+        "Owner": {
+            "Id": "user_id",
+            "Name": "Frodo",
+            "Email": "frodo@tlotr.com",
+        },
+        "ConvertedAccount": {},
+        "ConvertedContact": {},
+        "ConvertedOpportunity": {},
+    }
+)
+
+EXPECTED_LEAD_DOC = {
+    "_id": "lead_id",
+    "body": "Forger of the One Ring",
+    "company": "Mordor Inc.",
+    "converted_account": None,
+    "converted_account_url": None,
+    "converted_at": None,
+    "converted_contact": None,
+    "converted_contact_url": None,
+    "converted_opportunity": None,
+    "converted_opportunity_url": None,
+    "created_at": None,
+    "email": "sauron@tlotr.com",
+    "job_title": "Dark Lord",
+    "last_updated": "",
+    "lead_source": "Partner Referral",
+    "owner": "Frodo",
+    "owner_url": f"{TEST_BASE_URL}/user_id",
+    "phone": "09876543",
+    "rating": "Hot",
+    "source": "salesforce",
+    "status": "Working - Contacted",
+    "title": "Sauron",
+    "thumbnail": f"{TEST_BASE_URL}/services/images/photo/photo_id",
+    "type": "lead",
+    "url": f"{TEST_BASE_URL}/lead_id",
+}
+
 CAMPAIGN_RESPONSE_PAYLOAD = {
     "records": [
         {
@@ -204,6 +329,26 @@ CAMPAIGN_RESPONSE_PAYLOAD = {
     ]
 }
 
+EXPECTED_CAMPAIGN_DOC = {
+    "_id": "campaign_id",
+    "body": "Orcs are raiding the Gap of Rohan",
+    "campaign_type": "War",
+    "created_at": None,
+    "end_date": "",
+    "last_updated": None,
+    "owner": "Saruman",
+    "owner_email": "saruman@tlotr.com",
+    "parent": "Théoden",
+    "parent_url": f"{TEST_BASE_URL}/user_id",
+    "source": "salesforce",
+    "start_date": "",
+    "status": "planned",
+    "state": "active",
+    "title": "Defend the Gap",
+    "type": "campaign",
+    "url": f"{TEST_BASE_URL}/campaign_id",
+}
+
 CASE_RESPONSE_PAYLOAD = {
     "records": [
         {
@@ -302,6 +447,35 @@ CASE_RESPONSE_PAYLOAD = {
     ]
 }
 
+EXPECTED_CASE_DOC = {
+    "_id": "case_id",
+    "account_id": "account_id",
+    "body": "I know what it is you saw\n\nThe One Ring\n\nRing?!\nMaybe I should do something?\n\nYou have my axe",
+    "created_at": "2023-08-01T00:00:00.000+0000",
+    "created_by": "Gandalf",
+    "created_by_email": "gandalf@tlotr.com",
+    "case_number": "00001234",
+    "is_closed": False,
+    "last_updated": "2023-08-11T00:00:00.000+0000",
+    "owner": "Frodo",
+    "owner_email": "frodo@tlotr.com",
+    "participant_emails": [
+        "elrond@tlotr.com",
+        "frodo@tlotr.com",
+        "galadriel@tlotr.com",
+        "gandalf@tlotr.com",
+        "gimli@tlotr.com",
+        "samwise@tlotr.com",
+    ],
+    "participant_ids": ["user_id", "user_id_2", "user_id_3", "user_id_4"],
+    "participants": ["Frodo", "Galadriel", "Gandalf", "Gimli"],
+    "source": "salesforce",
+    "status": "New",
+    "title": "It needs to be destroyed",
+    "type": "case",
+    "url": f"{TEST_BASE_URL}/case_id",
+}
+
 CASE_FEED_RESPONSE_PAYLOAD = {
     "records": [
         {
@@ -356,6 +530,13 @@ CASE_FEED_RESPONSE_PAYLOAD = {
     ]
 }
 
+EXPECTED_CASE_RECORD = MappingProxyType(
+    {
+        **CASE_RESPONSE_PAYLOAD["records"][0],
+        "Feeds": CASE_FEED_RESPONSE_PAYLOAD["records"],
+    }
+)
+
 CONTENT_DOCUMENT_LINKS_PAYLOAD = {
     "records": [
         {
@@ -408,79 +589,175 @@ CONTENT_DOCUMENT_LINKS_PAYLOAD = {
     ]
 }
 
-CACHED_SOBJECTS = {
-    "Account": {"account_id": {"Id": "account_id", "Name": "TLOTR"}},
-    "User": {
-        "user_id": {
-            "Id": "user_id",
-            "Name": "Frodo",
-            "Email": "frodo@tlotr.com",
-        }
-    },
-    "Opportunity": {},
-    "Contact": {},
-}
+CACHED_SOBJECTS = MappingProxyType(
+    {
+        "Account": {"account_id": {"Id": "account_id", "Name": "TLOTR"}},
+        "User": {
+            "user_id": {
+                "Id": "user_id",
+                "Name": "Frodo",
+                "Email": "frodo@tlotr.com",
+            }
+        },
+        "Opportunity": {},
+        "Contact": {},
+    }
+)
+
+
+def _with_content_document_links(payload):
+    # records only get serialized, so they can all share the same links payload
+    return {
+        **payload,
+        "records": [
+            {**record, "ContentDocumentLinks": CONTENT_DOCUMENT_LINKS_PAYLOAD}
+            for record in payload["records"]
+        ],
+    }
+
+
+# Bodies served by salesforce_query_callback, merged and serialized once per
+# table so aioresponses doesn't json.dumps them again on every mocked query
+MERGED_PAYLOAD_BODIES = MappingProxyType(
+    {
+        table_name: json.dumps(payload).encode()
+        for table_name, payload in {
+            "Account": _with_content_document_links(ACCOUNT_RESPONSE_PAYLOAD),
+            "Campaign": _with_content_document_links(CAMPAIGN_RESPONSE_PAYLOAD),
+            "Case": _with_content_document_links(CASE_RESPONSE_PAYLOAD),
+            "CaseFeed": CASE_FEED_RESPONSE_PAYLOAD,
+            "Contact": _with_content_document_links(CONTACT_RESPONSE_PAYLOAD),
+            "Lead": _with_content_document_links(LEAD_RESPONSE_PAYLOAD),
+            "Opportunity": _with_content_document_links(OPPORTUNITY_RESPONSE_PAYLOAD),
+        }.items()
+    }
+)
+
+
+# Plain coroutine functions are much cheaper to set up than AsyncMock.
+# Tests that need to assert on calls patch in their own mocks.
+async def fake_token():
+    return "foo"
+
+
+async def fake_sobjects_cache():
+    return CACHED_SOBJECTS
+
+
+async def fake_is_queryable(sobject):
+    return True
+
+
+async def fake_select_queryable_fields(sobject, fields):
+    return RELEVANT_SOBJECT_FIELDS
+
+
+@lru_cache(maxsize=None)
+def salesforce_configuration(use_text_extraction_service):
+    """Builds the test configuration once per variant
+
+    Sources only read their configuration (set_defaults is idempotent),
+    so every source created with the same options can share it.
+    """
+    config = SalesforceDataSource.get_default_configuration()
+    config["domain"]["value"] = TEST_DOMAIN
+    config["client_id"]["value"] = TEST_CLIENT_ID
+    config["client_secret"]["value"] = TEST_CLIENT_SECRET
+    config["use_text_extraction_service"]["value"] = use_text_extraction_service
+
+    return DataSourceConfiguration(config)
 
 
 @asynccontextmanager
 async def create_salesforce_source(
     use_text_extraction_service=False, mock_token=True, mock_queryables=True
 ):
-    async with create_source(
-        SalesforceDataSource,
-        domain=TEST_DOMAIN,
-        client_id=TEST_CLIENT_ID,
-        client_secret=TEST_CLIENT_SECRET,
-        use_text_extraction_service=use_text_extraction_service,
-    ) as source:
+    source = SalesforceDataSource(
+        configuration=salesforce_configuration(use_text_extraction_service)
+    )
+    try:
         if mock_token is True:
-            source.salesforce_client.api_token.token = mock.AsyncMock(
-                return_value="foo"
-            )
+            source.salesforce_client.api_token.token = fake_token
 
         if mock_queryables is True:
-            source.salesforce_client.sobjects_cache_by_type = mock.AsyncMock(
-                return_value=CACHED_SOBJECTS
-            )
-            source.salesforce_client._is_queryable = mock.AsyncMock(return_value=True)
-            source.salesforce_client._select_queryable_fields = mock.AsyncMock(
-                return_value=RELEVANT_SOBJECT_FIELDS
+            source.salesforce_client.sobjects_cache_by_type = fake_sobjects_cache
+            source.salesforce_client._is_queryable = fake_is_queryable
+            source.salesforce_client._select_queryable_fields = (
+                fake_select_queryable_fields
             )
 
         yield source
+    finally:
+        await source.close()
+
+
+@pytest.fixture(scope="module")
+def event_loop():
+    """Runs this module on uvloop when the lib is present
+
+    uvloop isn't installed on Windows, so it falls back to the default loop there.
+    """
+    try:
+        import uvloop
+
+        loop = uvloop.new_event_loop()
+    except ImportError:
+        loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest_asyncio.fixture
+async def salesforce_source():
+    async with create_salesforce_source() as source:
+        yield source
+
+
+@pytest_asyncio.fixture
+async def unmocked_token_source():
+    async with create_salesforce_source(mock_token=False) as source:
+        yield source
+
+
+@pytest_asyncio.fixture
+async def unmocked_queryables_source():
+    async with create_salesforce_source(mock_queryables=False) as source:
+        yield source
+
+
+@pytest_asyncio.fixture
+async def text_extraction_source():
+    with patch(
+        "connectors.content_extraction.ContentExtraction.extract_text",
+        return_value="chunk1",
+    ), patch(
+        "connectors.content_extraction.ContentExtraction.get_extraction_config",
+        return_value={"host": "http://localhost:8090"},
+    ):
+        async with create_salesforce_source(use_text_extraction_service=True) as source:
+            yield source
+
+
+@lru_cache(maxsize=None)
+def queried_table_name(query):
+    """Returns the table name after the last "FROM" in a query
+
+    The connector sends the same handful of queries over and over,
+    so each one only needs to be scanned once.
+    """
+    match = None
+    for match in FROM_TABLE_PATTERN.finditer(query):  # noqa: B007
+        pass
+    return match.group(1)
 
 
 def salesforce_query_callback(url, **kwargs):
     """Dynamically returns a payload based on query
     and adds ContentDocumentLinks to each payload
     """
-    payload = {}
-
-    # get table name after last "FROM" in query
-    query = kwargs["params"]["q"]
-    table_name = re.findall(r"\bFROM\s+(\w+)", query)[-1]
-
-    match table_name:
-        case "Account":
-            payload = deepcopy(ACCOUNT_RESPONSE_PAYLOAD)
-        case "Campaign":
-            payload = deepcopy(CAMPAIGN_RESPONSE_PAYLOAD)
-        case "Case":
-            payload = deepcopy(CASE_RESPONSE_PAYLOAD)
-        case "CaseFeed":
-            payload = deepcopy(CASE_FEED_RESPONSE_PAYLOAD)
-        case "Contact":
-            payload = deepcopy(CONTACT_RESPONSE_PAYLOAD)
-        case "Lead":
-            payload = deepcopy(LEAD_RESPONSE_PAYLOAD)
-        case "Opportunity":
-            payload = deepcopy(OPPORTUNITY_RESPONSE_PAYLOAD)
-
-    if table_name != "CaseFeed":
-        for record in payload["records"]:
-            record["ContentDocumentLinks"] = deepcopy(CONTENT_DOCUMENT_LINKS_PAYLOAD)
-
-    return CallbackResult(status=200, payload=payload)
+    table_name = queried_table_name(kwargs["params"]["q"])
+
+    return CallbackResult(status=200, body=MERGED_PAYLOAD_BODIES[table_name])
 
 
 def generate_account_doc(identifier):
@@ -539,85 +816,88 @@ async def test_validate_config_missing_fields_then_raise(
 
 
 @pytest.mark.asyncio
-async def test_ping_with_successful_connection(mock_responses):
-    async with create_salesforce_source() as source:
-        mock_responses.head(TEST_BASE_URL, status=200)
+async def test_ping_with_successful_connection(salesforce_source, mock_responses):
+    mock_responses.head(TEST_BASE_URL, status=200)
 
-        await source.ping()
+    await salesforce_source.ping()
 
 
 @pytest.mark.asyncio
-async def test_generate_token_with_successful_connection(mock_responses):
-    async with create_salesforce_source() as source:
-        response_payload = {
-            "access_token": "foo",
-            "signature": "bar",
-            "instance_url": "https://fake.my.salesforce.com",
-            "id": "https://login.salesforce.com/id/1234",
-            "token_type": "Bearer",
-        }
+async def test_generate_token_with_successful_connection(
+    salesforce_source, mock_responses
+):
+    response_payload = {
+        "access_token": "foo",
+        "signature": "bar",
+        "instance_url": "https://fake.my.salesforce.com",
+        "id": "https://login.salesforce.com/id/1234",
+        "token_type": "Bearer",
+    }
 
-        mock_responses.post(
-            f"{TEST_BASE_URL}/services/oauth2/token",
-            status=200,
-            payload=response_payload,
-        )
-        assert await source.salesforce_client.api_token.token() == "foo"
+    mock_responses.post(
+        f"{TEST_BASE_URL}/services/oauth2/token",
+        status=200,
+        payload=response_payload,
+    )
+    assert await salesforce_source.salesforce_client.api_token.token() == "foo"
 
 
 @pytest.mark.asyncio
 async def test_generate_token_with_bad_domain_raises_error(
-    patch_sleep, mock_responses, patch_cancellable_sleeps
+    unmocked_token_source,
+    patch_sleep,
+    mock_responses,
+    patch_cancellable_sleeps,
 ):
-    async with create_salesforce_source(mock_token=False) as source:
-        mock_responses.post(
-            f"{TEST_BASE_URL}/services/oauth2/token", status=500, repeat=True
-        )
-        with pytest.raises(TokenFetchException):
-            await source.salesforce_client.api_token.token()
+    mock_responses.post(
+        f"{TEST_BASE_URL}/services/oauth2/token", status=500, repeat=True
+    )
+    with pytest.raises(TokenFetchException):
+        await unmocked_token_source.salesforce_client.api_token.token()
 
 
 @pytest.mark.asyncio
 async def test_generate_token_with_bad_credentials_raises_error(
-    patch_sleep, mock_responses, patch_cancellable_sleeps
+    unmocked_token_source,
+    patch_sleep,
+    mock_responses,
+    patch_cancellable_sleeps,
 ):
-    async with create_salesforce_source(mock_token=False) as source:
-        mock_responses.post(
-            f"{TEST_BASE_URL}/services/oauth2/token",
-            status=400,
-            payload={
-                "error": "invalid_client",
-                "error_description": "Invalid client credentials",
-            },
-            repeat=True,
-        )
-        with pytest.raises(InvalidCredentialsException):
-            await source.salesforce_client.api_token.token()
+    mock_responses.post(
+        f"{TEST_BASE_URL}/services/oauth2/token",
+        status=400,
+        payload={
+            "error": "invalid_client",
+            "error_description": "Invalid client credentials",
+        },
+        repeat=True,
+    )
+    with pytest.raises(InvalidCredentialsException):
+        await unmocked_token_source.salesforce_client.api_token.token()
 
 
 @pytest.mark.asyncio
 async def test_generate_token_with_unexpected_error_retries(
-    patch_sleep, mock_responses, patch_cancellable_sleeps
+    salesforce_source, patch_sleep, mock_responses, patch_cancellable_sleeps
 ):
-    async with create_salesforce_source() as source:
-        response_payload = {
-            "access_token": "foo",
-            "signature": "bar",
-            "instance_url": "https://fake.my.salesforce.com",
-            "id": "https://login.salesforce.com/id/1234",
-            "token_type": "Bearer",
-        }
+    response_payload = {
+        "access_token": "foo",
+        "signature": "bar",
+        "instance_url": "https://fake.my.salesforce.com",
+        "id": "https://login.salesforce.com/id/1234",
+        "token_type": "Bearer",
+    }
 
-        mock_responses.post(
-            f"{TEST_BASE_URL}/services/oauth2/token",
-            status=500,
-        )
-        mock_responses.post(
-            f"{TEST_BASE_URL}/services/oauth2/token",
-            status=200,
-            payload=response_payload,
-        )
-        assert await source.salesforce_client.api_token.token() == "foo"
+    mock_responses.post(
+        f"{TEST_BASE_URL}/services/oauth2/token",
+        status=500,
+    )
+    mock_responses.post(
+        f"{TEST_BASE_URL}/services/oauth2/token",
+        status=200,
+        payload=response_payload,
+    )
+    assert await salesforce_source.salesforce_client.api_token.token() == "foo"
 
 
 @pytest.mark.asyncio
@@ -635,573 +915,404 @@ async def test_generate_token_with_unexpected_error_retries(
     "connectors.sources.salesforce.RELEVANT_SOBJECTS",
     ["FooField", "BarField", "ArghField"],
 )
-async def test_get_queryable_sobjects(mock_responses, sobject, expected_result):
-    async with create_salesforce_source(mock_queryables=False) as source:
-        response_payload = {
-            "sobjects": [
-                {
-                    "queryable": True,
-                    "name": "FooField",
-                },
-                {
-                    "queryable": False,
-                    "name": "BarField",
-                },
-            ],
-        }
-
-        mock_responses.get(
-            f"{TEST_BASE_URL}/services/data/{API_VERSION}/sobjects",
-            status=200,
-            payload=response_payload,
-        )
-
-        queryable = await source.salesforce_client._is_queryable(sobject)
-        assert queryable == expected_result
-
-
-@pytest.mark.asyncio
-@mock.patch("connectors.sources.salesforce.RELEVANT_SOBJECTS", ["Account"])
-@mock.patch(
-    "connectors.sources.salesforce.RELEVANT_SOBJECT_FIELDS",
-    ["FooField", "BarField", "ArghField"],
-)
-async def test_get_queryable_fields(mock_responses):
-    async with create_salesforce_source(mock_queryables=False) as source:
-        expected_fields = [
+async def test_get_queryable_sobjects(
+    unmocked_queryables_source, mock_responses, sobject, expected_result
+):
+    response_payload = {
+        "sobjects": [
             {
+                "queryable": True,
                 "name": "FooField",
             },
             {
+                "queryable": False,
                 "name": "BarField",
             },
-            {"name": "ArghField"},
-        ]
-        response_payload = {
-            "fields": expected_fields,
-        }
-        mock_responses.get(
-            f"{TEST_BASE_URL}/services/data/{API_VERSION}/sobjects/Account/describe",
-            status=200,
-            payload=response_payload,
-        )
-
-        queryable_fields = await source.salesforce_client._select_queryable_fields(
-            "Account", ["FooField", "BarField", "NarghField"]
-        )
-        TestCase().assertCountEqual(queryable_fields, ["FooField", "BarField"])
-
+        ],
+    }
 
-@pytest.mark.asyncio
-async def test_get_accounts_when_success(mock_responses):
-    async with create_salesforce_source() as source:
-        payload = deepcopy(ACCOUNT_RESPONSE_PAYLOAD)
-        expected_record = payload["records"][0]
-
-        expected_doc = {
-            "_id": "account_id",
-            "account_type": "Customer - Direct",
-            "address": "The Burrow under the Hill, Bag End, Hobbiton, The Shire, Eriador, 111, Middle Earth",
-            "body": "A story about the One Ring.",
-            "content_source_id": "account_id",
-            "created_at": "",
-            "last_updated": "",
-            "owner": "Frodo",
-            "owner_email": "frodo@tlotr.com",
-            "open_activities": "",
-            "open_activities_urls": "",
-            "opportunity_name": "The Fellowship",
-            "opportunity_status": "Closed Won",
-            "opportunity_url": f"{TEST_BASE_URL}/opportunity_id",
-            "rating": "Hot",
-            "source": "salesforce",
-            "tags": ["Customer - Direct"],
-            "title": "TLOTR",
-            "type": "account",
-            "url": f"{TEST_BASE_URL}/account_id",
-            "website_url": "www.tlotr.com",
-        }
+    mock_responses.get(
+        f"{TEST_BASE_URL}/services/data/{API_VERSION}/sobjects",
+        status=200,
+        payload=response_payload,
+    )
 
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=200,
-            payload=ACCOUNT_RESPONSE_PAYLOAD,
-        )
-        async for record in source.salesforce_client.get_accounts():
-            assert record == expected_record
-            assert source.doc_mapper.map_account(record) == expected_doc
+    queryable = await unmocked_queryables_source.salesforce_client._is_queryable(
+        sobject
+    )
+    assert queryable == expected_result
 
 
 @pytest.mark.asyncio
-async def test_get_accounts_when_paginated_yields_all_pages(mock_responses):
-    async with create_salesforce_source() as source:
-        response_page_1 = {
-            "done": False,
-            "nextRecordsUrl": "/barbar",
-            "records": [
-                {
-                    "Id": 1234,
-                }
-            ],
-        }
-        response_page_2 = {
-            "done": True,
-            "records": [
-                {
-                    "Id": 5678,
-                }
-            ],
-        }
+@mock.patch("connectors.sources.salesforce.RELEVANT_SOBJECTS", ["Account"])
+@mock.patch(
+    "connectors.sources.salesforce.RELEVANT_SOBJECT_FIELDS",
+    ["FooField", "BarField", "ArghField"],
+)
+async def test_get_queryable_fields(unmocked_queryables_source, mock_responses):
+    expected_fields = [
+        {
+            "name": "FooField",
+        },
+        {
+            "name": "BarField",
+        },
+        {"name": "ArghField"},
+    ]
+    response_payload = {
+        "fields": expected_fields,
+    }
+    mock_responses.get(
+        f"{TEST_BASE_URL}/services/data/{API_VERSION}/sobjects/Account/describe",
+        status=200,
+        payload=response_payload,
+    )
 
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=200,
-            payload=response_page_1,
-        )
-        mock_responses.get(
-            f"{TEST_BASE_URL}/barbar",
-            status=200,
-            payload=response_page_2,
+    queryable_fields = (
+        await unmocked_queryables_source.salesforce_client._select_queryable_fields(
+            "Account", ["FooField", "BarField", "NarghField"]
         )
-
-        yielded_account_ids = []
-        async for record in source.salesforce_client.get_accounts():
-            yielded_account_ids.append(record["Id"])
-
-        assert sorted(yielded_account_ids) == [1234, 5678]
+    )
+    assert sorted(queryable_fields) == ["BarField", "FooField"]
 
 
 @pytest.mark.asyncio
-async def test_get_accounts_when_invalid_request(patch_sleep, mock_responses):
-    async with create_salesforce_source(mock_queryables=False) as source:
-        response_payload = [
-            {"message": "Unable to process query.", "errorCode": "INVALID_FIELD"}
-        ]
-
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=405,
-            payload=response_payload,
-        )
-        with pytest.raises(ClientConnectionError):
-            async for _ in source.salesforce_client.get_accounts():
-                # TODO confirm error message when error handling is improved
-                pass
+@pytest.mark.parametrize(
+    "fetcher, mapper, payload, expected_record, expected_doc",
+    [
+        (
+            "get_accounts",
+            "map_account",
+            ACCOUNT_RESPONSE_PAYLOAD,
+            ACCOUNT_RESPONSE_PAYLOAD["records"][0],
+            EXPECTED_ACCOUNT_DOC,
+        ),
+        (
+            "get_opportunities",
+            "map_opportunity",
+            OPPORTUNITY_RESPONSE_PAYLOAD,
+            OPPORTUNITY_RESPONSE_PAYLOAD["records"][0],
+            EXPECTED_OPPORTUNITY_DOC,
+        ),
+        (
+            "get_contacts",
+            "map_contact",
+            CONTACT_RESPONSE_PAYLOAD,
+            EXPECTED_CONTACT_RECORD,
+            EXPECTED_CONTACT_DOC,
+        ),
+        (
+            "get_leads",
+            "map_lead",
+            LEAD_RESPONSE_PAYLOAD,
+            EXPECTED_LEAD_RECORD,
+            EXPECTED_LEAD_DOC,
+        ),
+        (
+            "get_campaigns",
+            "map_campaign",
+            CAMPAIGN_RESPONSE_PAYLOAD,
+            CAMPAIGN_RESPONSE_PAYLOAD["records"][0],
+            EXPECTED_CAMPAIGN_DOC,
+        ),
+    ],
+)
+async def test_get_sobjects_when_success(
+    salesforce_source,
+    mock_responses,
+    fetcher,
+    mapper,
+    payload,
+    expected_record,
+    expected_doc,
+):
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=200,
+        payload=payload,
+    )
+    async for record in getattr(salesforce_source.salesforce_client, fetcher)():
+        assert record == expected_record
+        assert getattr(salesforce_source.doc_mapper, mapper)(record) == expected_doc
 
 
 @pytest.mark.asyncio
-async def test_get_accounts_when_not_queryable_yields_nothing(mock_responses):
-    async with create_salesforce_source() as source:
-        source.salesforce_client._is_queryable = mock.AsyncMock(return_value=False)
-        async for record in source.salesforce_client.get_accounts():
-            assert record is None
+async def test_get_accounts_when_paginated_yields_all_pages(
+    salesforce_source, mock_responses
+):
+    response_page_1 = {
+        "done": False,
+        "nextRecordsUrl": "/barbar",
+        "records": [
+            {
+                "Id": 1234,
+            }
+        ],
+    }
+    response_page_2 = {
+        "done": True,
+        "records": [
+            {
+                "Id": 5678,
+            }
+        ],
+    }
 
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=200,
+        payload=response_page_1,
+    )
+    mock_responses.get(
+        f"{TEST_BASE_URL}/barbar",
+        status=200,
+        payload=response_page_2,
+    )
 
-@pytest.mark.asyncio
-async def test_get_opportunities_when_success(mock_responses):
-    async with create_salesforce_source() as source:
-        expected_doc = {
-            "_id": "opportunity_id",
-            "body": "A fellowship of the races of Middle Earth",
-            "content_source_id": "opportunity_id",
-            "created_at": "",
-            "last_updated": "",
-            "next_step": None,
-            "owner": "Frodo",
-            "owner_email": "frodo@tlotr.com",
-            "source": "salesforce",
-            "status": "Closed Won",
-            "title": "The Fellowship",
-            "type": "opportunity",
-            "url": f"{TEST_BASE_URL}/opportunity_id",
-        }
+    yielded_account_ids = []
+    async for record in salesforce_source.salesforce_client.get_accounts():
+        yielded_account_ids.append(record["Id"])
 
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=200,
-            payload=OPPORTUNITY_RESPONSE_PAYLOAD,
-        )
-        async for record in source.salesforce_client.get_opportunities():
-            assert record == OPPORTUNITY_RESPONSE_PAYLOAD["records"][0]
-            assert source.doc_mapper.map_opportunity(record) == expected_doc
+    assert sorted(yielded_account_ids) == [1234, 5678]
 
 
 @pytest.mark.asyncio
-async def test_get_contacts_when_success(mock_responses):
-    async with create_salesforce_source() as source:
-        payload = deepcopy(CONTACT_RESPONSE_PAYLOAD)
-        expected_record = payload["records"][0]
-        expected_record["Account"] = {
-            "Id": "account_id",
-            "Name": "TLOTR",
-        }
-        expected_record["Owner"] = {
-            "Id": "user_id",
-            "Name": "Frodo",
-            "Email": "frodo@tlotr.com",
-        }
-
-        expected_doc = {
-            "_id": "contact_id",
-            "account": "TLOTR",
-            "account_url": f"{TEST_BASE_URL}/account_id",
-            "body": "The White",
-            "created_at": "",
-            "email": "gandalf@tlotr.com",
-            "job_title": "Wizard",
-            "last_updated": "",
-            "lead_source": "Partner Referral",
-            "owner": "Frodo",
-            "owner_url": f"{TEST_BASE_URL}/user_id",
-            "phone": "12345678",
-            "source": "salesforce",
-            "thumbnail": f"{TEST_BASE_URL}/services/images/photo/photo_id",
-            "title": "Gandalf",
-            "type": "contact",
-            "url": f"{TEST_BASE_URL}/contact_id",
-        }
+async def test_get_accounts_when_invalid_request(
+    unmocked_queryables_source, patch_sleep, mock_responses
+):
+    response_payload = [
+        {"message": "Unable to process query.", "errorCode": "INVALID_FIELD"}
+    ]
 
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=200,
-            payload=CONTACT_RESPONSE_PAYLOAD,
-        )
-        async for record in source.salesforce_client.get_contacts():
-            assert record == expected_record
-            assert source.doc_mapper.map_contact(record) == expected_doc
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=405,
+        payload=response_payload,
+    )
+    with pytest.raises(ClientConnectionError):
+        async for _ in unmocked_queryables_source.salesforce_client.get_accounts():
+            # TODO confirm error message when error handling is improved
+            pass
 
 
 @pytest.mark.asyncio
-async def test_get_leads_when_success(mock_responses):
-    async with create_salesforce_source() as source:
-        payload = deepcopy(LEAD_RESPONSE_PAYLOAD)
-        expected_record = payload["records"][0]
-        expected_record["Owner"] = {
-            "Id": "user_id",
-            "Name": "Frodo",
-            "Email": "frodo@tlotr.com",
-        }
-        expected_record["ConvertedAccount"] = {}
-        expected_record["ConvertedContact"] = {}
-        expected_record["ConvertedOpportunity"] = {}
-
-        expected_doc = {
-            "_id": "lead_id",
-            "body": "Forger of the One Ring",
-            "company": "Mordor Inc.",
-            "converted_account": None,
-            "converted_account_url": None,
-            "converted_at": None,
-            "converted_contact": None,
-            "converted_contact_url": None,
-            "converted_opportunity": None,
-            "converted_opportunity_url": None,
-            "created_at": None,
-            "email": "sauron@tlotr.com",
-            "job_title": "Dark Lord",
-            "last_updated": "",
-            "lead_source": "Partner Referral",
-            "owner": "Frodo",
-            "owner_url": f"{TEST_BASE_URL}/user_id",
-            "phone": "09876543",
-            "rating": "Hot",
-            "source": "salesforce",
-            "status": "Working - Contacted",
-            "title": "Sauron",
-            "thumbnail": f"{TEST_BASE_URL}/services/images/photo/photo_id",
-            "type": "lead",
-            "url": f"{TEST_BASE_URL}/lead_id",
-        }
-
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=200,
-            payload=LEAD_RESPONSE_PAYLOAD,
-        )
-        async for record in source.salesforce_client.get_leads():
-            assert record == expected_record
-            assert source.doc_mapper.map_lead(record) == expected_doc
+async def test_get_accounts_when_not_queryable_yields_nothing(salesforce_source):
+    salesforce_source.salesforce_client._is_queryable = mock.AsyncMock(
+        return_value=False
+    )
+    async for record in salesforce_source.salesforce_client.get_accounts():
+        assert record is None
 
 
 @pytest.mark.asyncio
-async def test_get_campaigns_when_success(mock_responses):
-    async with create_salesforce_source() as source:
-        expected_doc = {
-            "_id": "campaign_id",
-            "body": "Orcs are raiding the Gap of Rohan",
-            "campaign_type": "War",
-            "created_at": None,
-            "end_date": "",
-            "last_updated": None,
-            "owner": "Saruman",
-            "owner_email": "saruman@tlotr.com",
-            "parent": "Théoden",
-            "parent_url": f"{TEST_BASE_URL}/user_id",
-            "source": "salesforce",
-            "start_date": "",
-            "status": "planned",
-            "state": "active",
-            "title": "Defend the Gap",
-            "type": "campaign",
-            "url": f"{TEST_BASE_URL}/campaign_id",
-        }
-
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=200,
-            payload=CAMPAIGN_RESPONSE_PAYLOAD,
-        )
-        async for record in source.salesforce_client.get_campaigns():
-            assert record == CAMPAIGN_RESPONSE_PAYLOAD["records"][0]
-            assert source.doc_mapper.map_campaign(record) == expected_doc
+async def test_get_cases_when_success(salesforce_source, mock_responses):
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=200,
+        payload=CASE_RESPONSE_PAYLOAD,
+    )
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=200,
+        payload=CASE_FEED_RESPONSE_PAYLOAD,
+    )
+    async for record in salesforce_source.salesforce_client.get_cases():
+        assert record == EXPECTED_CASE_RECORD
+        assert salesforce_source.doc_mapper.map_case(record) == EXPECTED_CASE_DOC
 
 
 @pytest.mark.asyncio
-async def test_get_cases_when_success(mock_responses):
-    async with create_salesforce_source() as source:
-        payload = deepcopy(CASE_RESPONSE_PAYLOAD)
-        expected_record = payload["records"][0]
-
-        feeds_payload = deepcopy(CASE_FEED_RESPONSE_PAYLOAD)
-        expected_record["Feeds"] = feeds_payload["records"]
-
-        expected_doc = {
-            "_id": "case_id",
-            "account_id": "account_id",
-            "body": "I know what it is you saw\n\nThe One Ring\n\nRing?!\nMaybe I should do something?\n\nYou have my axe",
-            "created_at": "2023-08-01T00:00:00.000+0000",
-            "created_by": "Gandalf",
-            "created_by_email": "gandalf@tlotr.com",
-            "case_number": "00001234",
-            "is_closed": False,
-            "last_updated": "2023-08-11T00:00:00.000+0000",
-            "owner": "Frodo",
-            "owner_email": "frodo@tlotr.com",
-            "participant_emails": [
-                "elrond@tlotr.com",
-                "frodo@tlotr.com",
-                "galadriel@tlotr.com",
-                "gandalf@tlotr.com",
-                "gimli@tlotr.com",
-                "samwise@tlotr.com",
-            ],
-            "participant_ids": ["user_id", "user_id_2", "user_id_3", "user_id_4"],
-            "participants": ["Frodo", "Galadriel", "Gandalf", "Gimli"],
-            "source": "salesforce",
-            "status": "New",
-            "title": "It needs to be destroyed",
-            "type": "case",
-            "url": f"{TEST_BASE_URL}/case_id",
-        }
-
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=200,
-            payload=CASE_RESPONSE_PAYLOAD,
-        )
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=200,
-            payload=CASE_FEED_RESPONSE_PAYLOAD,
-        )
-        async for record in source.salesforce_client.get_cases():
-            assert record == expected_record
-            assert source.doc_mapper.map_case(record) == expected_doc
+async def test_get_all_with_content_docs_when_success(
+    salesforce_source, mock_responses
+):
+    expected_doc = {
+        "_id": "content_document_id",
+        "content_size": 1000,
+        "created_at": "",
+        "created_by": "Frodo",
+        "created_by_email": "frodo@tlotr.com",
+        "description": "A file about a ring.",
+        "file_extension": "txt",
+        "last_updated": "",
+        "linked_ids": [
+            "account_id",
+            "campaign_id",
+            "case_id",
+            "contact_id",
+            "lead_id",
+            "opportunity_id",
+        ],  # contains every SObject that is connected to this doc
+        "owner": "Frodo",
+        "owner_email": "frodo@tlotr.com",
+        "title": "the_ring.txt",
+        "type": "content_document",
+        "url": f"{TEST_BASE_URL}/content_document_id",
+        "version_number": "2",
+        "version_url": f"{TEST_BASE_URL}/content_version_id",
+    }
 
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL, repeat=True, callback=salesforce_query_callback
+    )
 
-@pytest.mark.asyncio
-@pytest.mark.parametrize(
-    "response_status, response_body, expected_attachment",
-    [
+    # Only the file download differs between cases, so they share one source
+    for response_status, response_body, expected_attachment in [
         (200, b"chunk1", "Y2h1bmsx"),  # base64 for "chunk1"
         (200, b"", ""),
         (404, None, None),
-    ],
-)
-async def test_get_all_with_content_docs_when_success(
-    mock_responses, response_status, response_body, expected_attachment
-):
-    async with create_salesforce_source() as source:
-        expected_doc = {
-            "_id": "content_document_id",
-            "content_size": 1000,
-            "created_at": "",
-            "created_by": "Frodo",
-            "created_by_email": "frodo@tlotr.com",
-            "description": "A file about a ring.",
-            "file_extension": "txt",
-            "last_updated": "",
-            "linked_ids": [
-                "account_id",
-                "campaign_id",
-                "case_id",
-                "contact_id",
-                "lead_id",
-                "opportunity_id",
-            ],  # contains every SObject that is connected to this doc
-            "owner": "Frodo",
-            "owner_email": "frodo@tlotr.com",
-            "title": "the_ring.txt",
-            "type": "content_document",
-            "url": f"{TEST_BASE_URL}/content_document_id",
-            "version_number": "2",
-            "version_url": f"{TEST_BASE_URL}/content_version_id",
-        }
-        if expected_attachment is not None:
-            expected_doc["_attachment"] = expected_attachment
-
+    ]:
         mock_responses.get(
             TEST_FILE_DOWNLOAD_URL,
             status=response_status,
             body=response_body,
         )
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL, repeat=True, callback=salesforce_query_callback
-        )
 
-        content_document_records = []
-        async for record, _ in source.get_docs():
-            if record["type"] == "content_document":
-                content_document_records.append(record)
+        content_document_records = [
+            record
+            async for record, _ in salesforce_source.get_docs()
+            if record["type"] == "content_document"
+        ]
 
-        TestCase().assertCountEqual(content_document_records, [expected_doc])
+        if expected_attachment is None:
+            assert content_document_records == [expected_doc]
+        else:
+            assert content_document_records == [
+                expected_doc | {"_attachment": expected_attachment}
+            ]
 
 
 @pytest.mark.asyncio
-async def test_get_all_with_content_docs_and_extraction_service(mock_responses):
-    with patch(
-        "connectors.content_extraction.ContentExtraction.extract_text",
-        return_value="chunk1",
-    ), patch(
-        "connectors.content_extraction.ContentExtraction.get_extraction_config",
-        return_value={"host": "http://localhost:8090"},
-    ):
-        async with create_salesforce_source(use_text_extraction_service=True) as source:
-            expected_doc = {
-                "_id": "content_document_id",
-                "content_size": 1000,
-                "created_at": "",
-                "created_by": "Frodo",
-                "created_by_email": "frodo@tlotr.com",
-                "body": "chunk1",
-                "description": "A file about a ring.",
-                "file_extension": "txt",
-                "last_updated": "",
-                "linked_ids": [
-                    "account_id",
-                    "campaign_id",
-                    "case_id",
-                    "contact_id",
-                    "lead_id",
-                    "opportunity_id",
-                ],  # contains every SObject that is connected to this doc
-                "owner": "Frodo",
-                "owner_email": "frodo@tlotr.com",
-                "title": "the_ring.txt",
-                "type": "content_document",
-                "url": f"{TEST_BASE_URL}/content_document_id",
-                "version_number": "2",
-                "version_url": f"{TEST_BASE_URL}/content_version_id",
-            }
+async def test_get_all_with_content_docs_and_extraction_service(
+    text_extraction_source, mock_responses
+):
+    expected_doc = {
+        "_id": "content_document_id",
+        "content_size": 1000,
+        "created_at": "",
+        "created_by": "Frodo",
+        "created_by_email": "frodo@tlotr.com",
+        "body": "chunk1",
+        "description": "A file about a ring.",
+        "file_extension": "txt",
+        "last_updated": "",
+        "linked_ids": [
+            "account_id",
+            "campaign_id",
+            "case_id",
+            "contact_id",
+            "lead_id",
+            "opportunity_id",
+        ],  # contains every SObject that is connected to this doc
+        "owner": "Frodo",
+        "owner_email": "frodo@tlotr.com",
+        "title": "the_ring.txt",
+        "type": "content_document",
+        "url": f"{TEST_BASE_URL}/content_document_id",
+        "version_number": "2",
+        "version_url": f"{TEST_BASE_URL}/content_version_id",
+    }
 
-            mock_responses.get(
-                TEST_FILE_DOWNLOAD_URL,
-                status=200,
-                body=b"chunk1",
-            )
-            mock_responses.get(
-                TEST_QUERY_MATCH_URL, repeat=True, callback=salesforce_query_callback
-            )
+    mock_responses.get(
+        TEST_FILE_DOWNLOAD_URL,
+        status=200,
+        body=b"chunk1",
+    )
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL, repeat=True, callback=salesforce_query_callback
+    )
 
-            content_document_records = []
-            async for record, _ in source.get_docs():
-                if record["type"] == "content_document":
-                    content_document_records.append(record)
+    content_document_records = [
+        record
+        async for record, _ in text_extraction_source.get_docs()
+        if record["type"] == "content_document"
+    ]
 
-            TestCase().assertCountEqual(content_document_records, [expected_doc])
+    assert content_document_records == [expected_doc]
 
 
 @pytest.mark.asyncio
-async def test_prepare_sobject_cache(mock_responses):
-    async with create_salesforce_source() as source:
-        sobjects = {
-            "records": [
-                {"Id": "id_1", "Name": "Foo", "Type": "Account"},
-                {"Id": "id_2", "Name": "Bar", "Type": "Account"},
-            ]
-        }
-        expected = {
-            "id_1": {"Id": "id_1", "Name": "Foo", "Type": "Account"},
-            "id_2": {"Id": "id_2", "Name": "Bar", "Type": "Account"},
-        }
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=200,
-            payload=sobjects,
-        )
-        sobjects = await source.salesforce_client._prepare_sobject_cache("Account")
-        assert sobjects == expected
+async def test_prepare_sobject_cache(salesforce_source, mock_responses):
+    sobjects = {
+        "records": [
+            {"Id": "id_1", "Name": "Foo", "Type": "Account"},
+            {"Id": "id_2", "Name": "Bar", "Type": "Account"},
+        ]
+    }
+    expected = {
+        "id_1": {"Id": "id_1", "Name": "Foo", "Type": "Account"},
+        "id_2": {"Id": "id_2", "Name": "Bar", "Type": "Account"},
+    }
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=200,
+        payload=sobjects,
+    )
+    sobjects = await salesforce_source.salesforce_client._prepare_sobject_cache(
+        "Account"
+    )
+    assert sobjects == expected
 
 
 @pytest.mark.asyncio
-async def test_request_when_token_invalid_refetches_token(patch_sleep, mock_responses):
-    async with create_salesforce_source(mock_token=False) as source:
-        payload = deepcopy(ACCOUNT_RESPONSE_PAYLOAD)
-        expected_record = payload["records"][0]
+async def test_request_when_token_invalid_refetches_token(
+    unmocked_token_source, patch_sleep, mock_responses
+):
+    expected_record = ACCOUNT_RESPONSE_PAYLOAD["records"][0]
 
-        invalid_token_payload = [
-            {
-                "message": "Session expired or invalid",
-                "errorCode": "INVALID_SESSION_ID",
-            }
-        ]
-        token_response_payload = {"access_token": "foo"}
-        mock_responses.post(
-            f"{TEST_BASE_URL}/services/oauth2/token",
-            status=200,
-            payload=token_response_payload,
-            repeat=True,
-        )
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=401,
-            payload=invalid_token_payload,
-        )
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=200,
-            payload=ACCOUNT_RESPONSE_PAYLOAD,
-        )
+    invalid_token_payload = [
+        {
+            "message": "Session expired or invalid",
+            "errorCode": "INVALID_SESSION_ID",
+        }
+    ]
+    token_response_payload = {"access_token": "foo"}
+    mock_responses.post(
+        f"{TEST_BASE_URL}/services/oauth2/token",
+        status=200,
+        payload=token_response_payload,
+        repeat=True,
+    )
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=401,
+        payload=invalid_token_payload,
+    )
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=200,
+        payload=ACCOUNT_RESPONSE_PAYLOAD,
+    )
 
-        with mock.patch.object(
-            source.salesforce_client.api_token,
-            "token",
-            wraps=source.salesforce_client.api_token.token,
-        ) as mock_get_token:
-            async for record in source.salesforce_client.get_accounts():
-                assert record == expected_record
-                # assert called once for initial query, called again after invalid_token_payload
-                assert mock_get_token.call_count == 2
+    with mock.patch.object(
+        unmocked_token_source.salesforce_client.api_token,
+        "token",
+        wraps=unmocked_token_source.salesforce_client.api_token.token,
+    ) as mock_get_token:
+        async for record in unmocked_token_source.salesforce_client.get_accounts():
+            assert record == expected_record
+            # assert called once for initial query, called again after invalid_token_payload
+            assert mock_get_token.call_count == 2
 
 
 @pytest.mark.asyncio
-async def test_request_when_rate_limited_raises_error_no_retries(mock_responses):
-    async with create_salesforce_source() as source:
-        response_payload = [
-            {
-                "message": "Request limit has been exceeded.",
-                "errorCode": "REQUEST_LIMIT_EXCEEDED",
-            }
-        ]
-        mock_responses.get(
-            re.compile(f"{TEST_BASE_URL}/services/data/{API_VERSION}/query*"),
-            status=403,
-            payload=response_payload,
-        )
+async def test_request_when_rate_limited_raises_error_no_retries(
+    salesforce_source, mock_responses
+):
+    response_payload = [
+        {
+            "message": "Request limit has been exceeded.",
+            "errorCode": "REQUEST_LIMIT_EXCEEDED",
+        }
+    ]
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=403,
+        payload=response_payload,
+    )
 
-        with pytest.raises(RateLimitedException):
-            async for _ in source.salesforce_client.get_accounts():
-                pass
+    with pytest.raises(RateLimitedException):
+        async for _ in salesforce_source.salesforce_client.get_accounts():
+            pass
 
 
 @pytest.mark.asyncio
@@ -1214,56 +1325,58 @@ async def test_request_when_rate_limited_raises_error_no_retries(mock_responses)
     ],
 )
 async def test_request_when_invalid_query_raises_error_no_retries(
-    mock_responses, error_code
+    salesforce_source, mock_responses, error_code
 ):
-    async with create_salesforce_source() as source:
-        response_payload = [
-            {
-                "message": "Invalid query.",
-                "errorCode": error_code,
-            }
-        ]
-        mock_responses.get(
-            re.compile(f"{TEST_BASE_URL}/services/data/{API_VERSION}/query*"),
-            status=400,
-            payload=response_payload,
-        )
+    response_payload = [
+        {
+            "message": "Invalid query.",
+            "errorCode": error_code,
+        }
+    ]
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=400,
+        payload=response_payload,
+    )
 
-        with pytest.raises(InvalidQueryException):
-            async for _ in source.salesforce_client.get_accounts():
-                pass
+    with pytest.raises(InvalidQueryException):
+        async for _ in salesforce_source.salesforce_client.get_accounts():
+            pass
 
 
 @pytest.mark.asyncio
 async def test_request_when_generic_400_raises_error_with_retries(
-    patch_sleep, mock_responses
+    salesforce_source, patch_sleep, mock_responses
 ):
-    async with create_salesforce_source() as source:
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=400,
-            repeat=True,
-        )
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=400,
+        repeat=True,
+    )
+
+    with pytest.raises(ConnectorRequestError):
+        async for _ in salesforce_source.salesforce_client.get_accounts():
+            pass
 
-        with pytest.raises(ConnectorRequestError):
-            async for _ in source.salesforce_client.get_accounts():
-                pass
+    # every failed attempt but the last is followed by a (patched) sleep
+    assert patch_sleep.await_count == RETRIES - 1
 
 
 @pytest.mark.asyncio
 async def test_request_when_generic_500_raises_error_with_retries(
-    patch_sleep, mock_responses
+    salesforce_source, patch_sleep, mock_responses
 ):
-    async with create_salesforce_source() as source:
-        mock_responses.get(
-            TEST_QUERY_MATCH_URL,
-            status=500,
-            repeat=True,
-        )
+    mock_responses.get(
+        TEST_QUERY_MATCH_URL,
+        status=500,
+        repeat=True,
+    )
+
+    with pytest.raises(SalesforceServerError):
+        async for _ in salesforce_source.salesforce_client.get_accounts():
+            pass
 
-        with pytest.raises(SalesforceServerError):
-            async for _ in source.salesforce_client.get_accounts():
-                pass
+    assert patch_sleep.await_count == RETRIES - 1
 
 
 @pytest.mark.asyncio
@@ -1297,10 +1410,10 @@ async def test_build_soql_query_with_fields():
     # ORDER BY CreatedDate DESC
     # LIMIT 2
 
-    query_columns_str = re.search("SELECT (.*)\nFROM", query, re.DOTALL).group(1)
+    query_columns_str = query.split("\nFROM", 1)[0][len("SELECT ") :]
     query_columns = query_columns_str.split(",\n")
 
-    TestCase().assertCountEqual(query_columns, expected_columns)
+    assert sorted(query_columns) == sorted(expected_columns)
     assert query.startswith("SELECT ")
     assert query.endswith(
         "FROM Test\nWHERE FooField = 'FOO'\nORDER BY CreatedDate DESC\nLIMIT 2"
@@ -1308,23 +1421,26 @@ async def test_build_soql_query_with_fields():
 
 
 @pytest.mark.asyncio
-async def test_combine_duplicate_content_docs_with_duplicates():
-    async with create_salesforce_source(mock_queryables=False) as source:
-        content_docs = [
-            {
-                "Id": "content_doc_1",
-                "linked_sobject_id": "account_id",
-            },
-            {
-                "Id": "content_doc_1",
-                "linked_sobject_id": "case_id",
-            },
-            {"Id": "content_doc_2", "linked_sobject_id": "account_id"},
-        ]
-        expected_docs = [
-            {"Id": "content_doc_1", "linked_ids": ["account_id", "case_id"]},
-            {"Id": "content_doc_2", "linked_ids": ["account_id"]},
-        ]
+async def test_combine_duplicate_content_docs_with_duplicates(
+    unmocked_queryables_source,
+):
+    content_docs = [
+        {
+            "Id": "content_doc_1",
+            "linked_sobject_id": "account_id",
+        },
+        {
+            "Id": "content_doc_1",
+            "linked_sobject_id": "case_id",
+        },
+        {"Id": "content_doc_2", "linked_sobject_id": "account_id"},
+    ]
+    expected_docs = [
+        {"Id": "content_doc_1", "linked_ids": ["account_id", "case_id"]},
+        {"Id": "content_doc_2", "linked_ids": ["account_id"]},
+    ]
 
-        combined_docs = source._combine_duplicate_content_docs(content_docs)
-        TestCase().assertCountEqual(combined_docs, expected_docs)
+    combined_docs = unmocked_queryables_source._combine_duplicate_content_docs(
+        content_docs
+    )
+    assert sorted(combined_docs, key=lambda doc: doc["Id"]) == expected_docs